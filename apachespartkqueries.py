@@ -3,38 +3,7 @@ from pyspark.sql.functions import col, size, explode, count, avg, array_contains
 import time
 from pyspark.sql import functions as F
 from pyspark.sql.utils import AnalysisException
-
-
-mongo_host = "localhost"
-mongo_port = "27017"
-mongo_user = "admin"
-mongo_password = "password"
-auth_db = "admin"
-db_name = "university_mongodb"  
-try:
-    # Initialize Spark session
-    spark = SparkSession.builder \
-    .appName("SparkMongoDBExample") \
-    .config("spark.jars.packages", "org.mongodb.spark:mongo-spark-connector_2.12:3.0.1") \
-    .config("spark.mongodb.input.uri", f"mongodb://{mongo_user}:{mongo_password}@{mongo_host}:{mongo_port}/{db_name}?authSource={auth_db}") \
-    .config("spark.mongodb.output.uri", f"mongodb://{mongo_user}:{mongo_password}@{mongo_host}:{mongo_port}/{db_name}?authSource={auth_db}") \
-    .getOrCreate()
-
-    print("Session created")
-
-    
-
-    # courses_data.show()
-
-except AnalysisException as e:
-    print("Failed to connect to MongoDB:", e)
-
-except Exception as e:
-    print("An error occurred:", e)
-
-
-from pyspark.sql.functions import size
-
+from spark_session import get_spark
 
 
 
@@ -44,7 +13,7 @@ def get_students_in_course(course_id):
     start_time = time.time()
     from pyspark.sql.functions import struct
 
-    students_in_course = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
+    students_in_course = get_spark().read.format("com.mongodb.spark.sql.DefaultSource") \
         .option("collection", "courses") \
         .option("pipeline", f"[{{'$match': {{ 'course_id': '{course_id}' }} }}]") \
         .load() \
@@ -65,14 +34,12 @@ def get_students_in_course(course_id):
 
     return count  # Count the number of distinct student IDs
 
-print(get_students_in_course(1))
-print(get_students_in_course(5))
 
 
 def get_avg_students_per_instructor(instructor_id):
     # Read the instructors collection to find the courses taught by the instructor
     start_time = time.time()
-    instructor_courses = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
+    instructor_courses = get_spark().read.format("com.mongodb.spark.sql.DefaultSource") \
         .option("collection", "instructors") \
         .option("pipeline", f"[{{'$match': {{ 'instructor_id': '{instructor_id}' }} }}]") \
         .load() \
@@ -83,7 +50,7 @@ def get_avg_students_per_instructor(instructor_id):
     course_ids = [course["course_id"] for course in instructor_courses]
 
     # Read the courses collection and calculate the number of students for each course
-    avg_students_per_course = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
+    avg_students_per_course = get_spark().read.format("com.mongodb.spark.sql.DefaultSource") \
         .option("collection", "courses") \
         .option("pipeline", "[{ '$match': { '$expr': { '$in': ['$course_id', " + str(course_ids) + "] } }}]") \
         .load() \
@@ -95,47 +62,41 @@ def get_avg_students_per_instructor(instructor_id):
     print(f"Query 2 Execution Time: {execution_time:.2f} seconds")
     return avg_students_per_course
 
-average_students = get_avg_students_per_instructor('9')
-print(f"Average students per course for instructor 'Instructor 1': {round(average_students)}")
 
 
 
 def get_courses_in_department(department_id):
     start_time = time.time()
-    courses_in_department = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
+    courses_in_department = get_spark().read.format("com.mongodb.spark.sql.DefaultSource") \
         .option("collection", "courses") \
         .load() \
         .filter(F.col("department.department_id") == department_id) \
-        .select("course_id", "name", "course_code")
+        .select("course_id", "name", "course_code") \
+        .collect()
 
     end_time = time.time()  # End time
     execution_time = end_time - start_time
     print(f"Query 3 Execution Time: {execution_time:.2f} seconds")
     
-    return courses_in_department.collect()
+    return courses_in_department
 
-print("Courses offered by department 'CSB':")
-for course in get_courses_in_department("2"):
-    print(f"{course['name']} ({course['course_code']})")
 
 
 def get_students_per_department():
     # Read the departments collection
     start_time = time.time()
-    students_per_department = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
+    students_per_department = get_spark().read.format("com.mongodb.spark.sql.DefaultSource") \
         .option("collection", "departments") \
         .load() \
         .select("department_id", "name", "students") \
         .withColumn("num_students", size("students")) \
-        .select("department_id", "name", "num_students")  # Select the relevant columns
+        .select("department_id", "name", "num_students") \
+        .collect()  # Collect the results
     end_time = time.time()  # End time
     execution_time = end_time - start_time
     print(f"Query 4 Execution Time: {execution_time:.2f} seconds")
-    return students_per_department.collect()  # Collect the results
+    return students_per_department
 
-print("Students per department:")
-for dept in get_students_per_department():
-    print(f"{dept['name']}: {dept['num_students']} students")
 
 
 
@@ -143,7 +104,7 @@ from pyspark.sql import functions as F
 
 def count_instructors_for_cs_courses():
     start_time = time.time()
-    cs_courses = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
+    cs_courses = get_spark().read.format("com.mongodb.spark.sql.DefaultSource") \
         .option("collection", "courses") \
         .load() \
         .filter(F.col("name").startswith("CSE"))\
@@ -161,8 +122,6 @@ def count_instructors_for_cs_courses():
     print(f"Query 5 Execution Time: {execution_time:.2f} seconds")
     return distinct_instructors_count
 
-# Example usage
-print(f"Number of distinct instructors for courses starting with 'CSE': {count_instructors_for_cs_courses()}")
 
 
 from pyspark.sql.functions import size, col, desc, expr
@@ -172,7 +131,7 @@ def get_top_courses_by_enrollments():
     start_time = time.time()  # Start time
     
     # First, let's fetch all courses without any limit to investigate
-    all_courses = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
+    all_courses = get_spark().read.format("com.mongodb.spark.sql.DefaultSource") \
         .option("collection", "courses") \
         .load() \
         .select("course_id", "name", "enrollments") \
@@ -185,13 +144,36 @@ def get_top_courses_by_enrollments():
     null_enrollments = all_courses.filter(col("enrollments").isNull()).count()
     print(f"Courses with null enrollments: {null_enrollments}")
     top_courses = all_courses.orderBy(desc("enrollments_count")).limit(10)
+    rows = top_courses.collect()
     end_time = time.time()  # End time
     execution_time = end_time - start_time
     print(f"Query 6 Execution Time: {execution_time:.2f} seconds")
-    for course in top_courses.collect():
+    for course in rows:
         print(f"Course ID: {course['course_id']}, Course Name: {course['name']}, Enrollments: {course['enrollments_count']}")
 
-    return top_courses
+    return rows
+
+
+def main():
+    print(get_students_in_course(1))
+    print(get_students_in_course(5))
+
+    average_students = get_avg_students_per_instructor('9')
+    print(f"Average students per course for instructor 'Instructor 1': {round(average_students)}")
+
+    print("Courses offered by department 'CSB':")
+    for course in get_courses_in_department("2"):
+        print(f"{course['name']} ({course['course_code']})")
+
+    print("Students per department:")
+    for dept in get_students_per_department():
+        print(f"{dept['name']}: {dept['num_students']} students")
+
+    # Example usage
+    print(f"Number of distinct instructors for courses starting with 'CSE': {count_instructors_for_cs_courses()}")
+
+    # Run the function
+    get_top_courses_by_enrollments()
 
-# Run the function
-get_top_courses_by_enrollments()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
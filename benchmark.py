@@ -0,0 +1,179 @@
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import statistics
+import subprocess
+import time
+import db_connections
+from etl_metrics import percentile
+from query_backends import MongoBackend, QUERIES
+from run_queries import MODULES, STORAGE_LEVELS
+from spark_session import stop_spark
+
+# Query sets that can be benchmarked: the Spark query modules plus the PyMongo backend
+TARGETS = list(MODULES) + ["mongo"]
+
+
+def load_target(name, args):
+    if name == "mongo":
+        return MongoBackend(db_connections.get_mongo_db())
+    queries = importlib.import_module(MODULES[name])
+    if name == "parquet" and args.parquet_dir:
+        queries.configure(args.parquet_dir)
+    if name == "optimizations" and args.storage_level:
+        queries.configure(args.storage_level)
+    return queries
+
+
+def query_args(number, args):
+    return {1: (args.course_id,), 2: (args.instructor_id,), 3: (args.department_id,)}.get(number, ())
+
+
+def materialize(result):
+    # Returns the number of records a query produced. Every query runs its own actions
+    # before returning, so nothing is recomputed here: collected rows are counted,
+    # fetched results are iterated, counts are the number of records counted
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, int):
+        return result
+    if hasattr(result, "__iter__"):
+        rows = sum(1 for _ in result)   # QueryResult: pandas rows or a streamed iterator
+        result.close()
+        return rows
+    return 1
+
+
+def time_query(queries, number, args):
+    function = getattr(queries, QUERIES[number])
+    # The queries' own prints are discarded unless --verbose
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        start = time.perf_counter()
+        rows = materialize(function(*query_args(number, args)))
+        latency = time.perf_counter() - start
+    return latency, rows
+
+
+def benchmark_query(queries, number, args):
+    for _ in range(args.warmup):
+        time_query(queries, number, args)
+    latencies = []
+    rows = 0
+    for _ in range(args.runs):
+        latency, rows = time_query(queries, number, args)
+        latencies.append(latency)
+    median = statistics.median(latencies)
+    return {
+        "query": number,
+        "function": QUERIES[number],
+        "runs": args.runs,
+        "warmup": args.warmup,
+        "rows": rows,
+        "min_seconds": round(min(latencies), 6),
+        "median_seconds": round(median, 6),
+        "p95_seconds": round(percentile(latencies, 95), 6),
+        "mean_seconds": round(statistics.mean(latencies), 6),
+        "rows_per_second": round(rows / median, 2) if median > 0 else 0.0,
+    }
+
+
+def data_version():
+    meta = db_connections.get_mongo_db().migration_meta.find_one({"_id": "data_version"})
+    return meta["version"] if meta else None
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    # Speedup of each target's median latency over the baseline target, per query
+    reference = {entry["query"]: entry["median_seconds"] for entry in results.get(baseline, [])}
+    comparison = {}
+    for target, entries in results.items():
+        if target == baseline:
+            continue
+        comparison[target] = {
+            str(entry["query"]): round(reference[entry["query"]] / entry["median_seconds"], 3)
+            for entry in entries if entry["query"] in reference and entry["median_seconds"] > 0
+        }
+    return comparison
+
+
+def print_table(report):
+    print(f"{'target':<14}{'query':>6}{'min (s)':>11}{'median (s)':>12}{'p95 (s)':>11}{'rows':>10}{'rows/s':>12}{'speedup':>9}")
+    for target, entries in report["results"].items():
+        speedups = report["speedup_vs_baseline"].get(target, {})
+        for entry in entries:
+            speedup = speedups.get(str(entry["query"]))
+            print(f"{target:<14}{entry['query']:>6}{entry['min_seconds']:>11.3f}{entry['median_seconds']:>12.3f}"
+                  f"{entry['p95_seconds']:>11.3f}{entry['rows']:>10}{entry['rows_per_second']:>12.1f}"
+                  f"{(f'{speedup:.2f}x' if speedup else '-'):>9}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the query sets against the same MongoDB dataset")
+    parser.add_argument("--targets", nargs="+", choices=TARGETS, default=["baseline", "optimizations"],
+                        help="query sets to run, the first one is the baseline of the comparison")
+    parser.add_argument("--query", type=int, action="append", choices=range(1, 7),
+                        help="query number to benchmark (repeatable); all six queries by default")
+    parser.add_argument("--runs", type=int, default=5, help="timed runs per query")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs per query before the timed ones")
+    parser.add_argument("--course-id", default="1", help="course for query 1")
+    parser.add_argument("--instructor-id", default="9", help="instructor for query 2")
+    parser.add_argument("--department-id", default="2", help="department for query 3")
+    parser.add_argument("--parquet-dir", help="Parquet export read by the parquet target")
+    parser.add_argument("--storage-level", choices=STORAGE_LEVELS,
+                        help="catalog storage level of the optimizations target; NONE measures the MongoDB pushdown")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep the output printed by the queries")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    queries_to_run = args.query or list(QUERIES)
+    results = {}
+    try:
+        version = data_version()
+        for target in args.targets:
+            queries = load_target(target, args)
+            results[target] = []
+            for number in queries_to_run:
+                results[target].append(benchmark_query(queries, number, args))
+                print(f"{target} query {number}: median {results[target][-1]['median_seconds']:.3f} seconds")
+        # Every target must have read the same dataset for the comparison to hold
+        if data_version() != version:
+            raise RuntimeError("The data version changed during the benchmark, rerun it on a stable dataset")
+    finally:
+        stop_spark()
+        db_connections.close_all()
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": git_commit(),
+        "data_version": version,
+        "baseline": args.targets[0],
+        "runs": args.runs,
+        "warmup": args.warmup,
+        "parameters": {"course_id": args.course_id, "instructor_id": args.instructor_id,
+                       "department_id": args.department_id, "storage_level": args.storage_level},
+        "results": results,
+        "speedup_vs_baseline": compare(results, args.targets[0]),
+    }
+    print_table(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
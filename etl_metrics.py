@@ -0,0 +1,155 @@
+import json
+import math
+import time
+import bson
+
+
+def percentile(values, p):
+    # Nearest-rank percentile, 0 for an empty list
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def payload_size(*parts):
+    # Approximate bytes sent for a write: the BSON size of its documents
+    return sum(len(bson.encode(part)) for part in parts if part)
+
+
+class StageMetrics:
+    # Counters and timings for one ETL stage (or one partition of it)
+    def __init__(self, stage):
+        self.stage = stage
+        self.rows_extracted = 0
+        self.inserted = 0
+        self.matched = 0
+        self.modified = 0
+        self.upserted = 0
+        self.deleted = 0
+        self.batches = 0
+        self.bytes_sent = 0
+        self.extract_time = 0.0
+        self.load_time = 0.0
+        self.total_time = 0.0
+        self.write_latencies = []
+        self.batch_results = []   # Per-batch write results from BulkWriter
+        self._start = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        return self
+
+    def finish(self):
+        self.total_time += time.perf_counter() - self._start
+        return self
+
+    def track_rows(self, rows):
+        # Wraps the extraction iterator, counting rows and the time spent waiting on them
+        iterator = iter(rows)
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(iterator)
+            except StopIteration:
+                self.extract_time += time.perf_counter() - start
+                return
+            self.extract_time += time.perf_counter() - start
+            self.rows_extracted += 1
+            yield row
+
+    def record_batch(self, result, latency, size):
+        self.batch_results.append(result)
+        self.batches += 1
+        self.bytes_sent += size
+        self.load_time += latency
+        self.write_latencies.append(latency)
+        for key in ("inserted", "matched", "modified", "upserted", "deleted"):
+            setattr(self, key, getattr(self, key) + result[key])
+
+    def merge(self, other):
+        # Partitions of a stage run in parallel, so their times add up to stage work, not wall time
+        for key in ("rows_extracted", "inserted", "matched", "modified", "upserted", "deleted",
+                    "batches", "bytes_sent", "extract_time", "load_time", "total_time"):
+            setattr(self, key, getattr(self, key) + getattr(other, key))
+        self.write_latencies.extend(other.write_latencies)
+        self.batch_results.extend(other.batch_results)
+        return self
+
+    @property
+    def transform_time(self):
+        return max(0.0, self.total_time - self.extract_time - self.load_time)
+
+    def to_dict(self):
+        return {
+            "stage": self.stage,
+            "rows_extracted": self.rows_extracted,
+            "inserted": self.inserted,
+            "updated": self.modified,
+            "matched": self.matched,
+            "upserted": self.upserted,
+            "deleted": self.deleted,
+            "batches": self.batches,
+            "bytes_sent": self.bytes_sent,
+            "extract_seconds": round(self.extract_time, 6),
+            "transform_seconds": round(self.transform_time, 6),
+            "load_seconds": round(self.load_time, 6),
+            "total_seconds": round(self.total_time, 6),
+            "write_latency_seconds": {
+                "p50": round(percentile(self.write_latencies, 50), 6),
+                "p95": round(percentile(self.write_latencies, 95), 6),
+                "p99": round(percentile(self.write_latencies, 99), 6),
+            },
+        }
+
+    def summary_line(self):
+        return (f"{self.stage}: {self.total_time:.2f}s (extract {self.extract_time:.2f}s, "
+                f"transform {self.transform_time:.2f}s, load {self.load_time:.2f}s), "
+                f"{self.rows_extracted} rows, {self.inserted} inserted, {self.modified} updated, "
+                f"{self.batches} batches")
+
+
+def build_report(stage_metrics, **run_info):
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **run_info,
+        "stages": [metrics.to_dict() for metrics in stage_metrics],
+    }
+
+
+def write_json_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Metrics report written to {path}")
+
+
+# Prometheus text exposition: (metric name, type, help, report field)
+PROMETHEUS_METRICS = [
+    ("etl_rows_extracted_total", "counter", "Rows read from PostgreSQL", "rows_extracted"),
+    ("etl_documents_inserted_total", "counter", "Documents inserted into MongoDB", "inserted"),
+    ("etl_documents_updated_total", "counter", "Documents modified in MongoDB", "updated"),
+    ("etl_batches_total", "counter", "Write batches sent to MongoDB", "batches"),
+    ("etl_bytes_sent_total", "counter", "Approximate BSON bytes written to MongoDB (0 unless measured)", "bytes_sent"),
+    ("etl_extract_seconds", "gauge", "Time spent reading from PostgreSQL", "extract_seconds"),
+    ("etl_transform_seconds", "gauge", "Time spent building documents", "transform_seconds"),
+    ("etl_load_seconds", "gauge", "Time spent writing to MongoDB", "load_seconds"),
+    ("etl_stage_seconds", "gauge", "Total stage time", "total_seconds"),
+]
+
+
+def write_prometheus_report(report, path):
+    lines = []
+    for name, kind, help_text, field in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for stage in report["stages"]:
+            lines.append(f'{name}{{stage="{stage["stage"]}"}} {stage[field]}')
+    lines.append("# HELP etl_write_latency_seconds MongoDB batch write latency")
+    lines.append("# TYPE etl_write_latency_seconds summary")
+    for stage in report["stages"]:
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            lines.append(f'etl_write_latency_seconds{{stage="{stage["stage"]}",quantile="{quantile}"}} '
+                         f'{stage["write_latency_seconds"][key]}')
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"Prometheus metrics written to {path}")
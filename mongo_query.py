@@ -0,0 +1,138 @@
+import json
+import os
+import re
+from pyspark.sql import functions as F
+from pyspark.sql.types import StructType, StructField, StringType, DoubleType, ArrayType
+
+MONGO_FORMAT = "com.mongodb.spark.sql.DefaultSource"
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mongodb_schema.json")
+
+_schemas = None
+
+
+def to_spark_type(spec):
+    # mongodb_schema.json: "String"/"Double" leaves, nested objects and single-element arrays of objects
+    if isinstance(spec, dict):
+        return StructType([StructField(name, to_spark_type(value), True) for name, value in spec.items()])
+    if isinstance(spec, list):
+        return ArrayType(to_spark_type(spec[0]), True)
+    if spec == "Double":
+        return DoubleType()
+    if spec == "ObjectId":
+        return StructType([StructField("oid", StringType(), True)])
+    return StringType()
+
+
+def collection_schema(collection, fields=None):
+    # Explicit StructType for a collection, optionally pruned to the top-level fields
+    # that a query needs, so the connector neither samples documents nor reads other fields
+    global _schemas
+    if _schemas is None:
+        with open(SCHEMA_PATH) as f:
+            _schemas = json.load(f)
+    schema = to_spark_type(_schemas[collection])
+    if fields is None:
+        return schema
+    top_level = {field.split(".")[0] for field in fields}
+    return StructType([field for field in schema.fields if field.name in top_level])
+
+
+class MongoQuery:
+    # A chain of filters and a projection on one collection. It is sent to MongoDB as
+    # $match/$project pipeline stages, or applied with the equivalent Spark expressions
+    # when the collection is already cached
+    def __init__(self, collection):
+        self.collection = collection
+        self.conditions = []
+        self.fields = None
+        self.sort = None
+        self.max_rows = None
+
+    def where_eq(self, field, value):
+        self.conditions.append((field, "eq", value))
+        return self
+
+    def where_in(self, field, values):
+        self.conditions.append((field, "in", list(values)))
+        return self
+
+    def where_prefix(self, field, prefix):
+        self.conditions.append((field, "prefix", prefix))
+        return self
+
+    def select(self, *fields):
+        self.fields = list(fields)
+        return self
+
+    def order_by(self, field, descending=False):
+        self.sort = (field, descending)
+        return self
+
+    def limit(self, max_rows):
+        self.max_rows = max_rows
+        return self
+
+    def pipeline(self):
+        stages = []
+        if self.conditions:
+            match = {}
+            for field, op, value in self.conditions:
+                if op == "eq":
+                    match[field] = value
+                elif op == "in":
+                    match[field] = {"$in": value}
+                else:
+                    match[field] = {"$regex": "^" + re.escape(value)}
+            stages.append({"$match": match})
+        if self.sort is not None:
+            field, descending = self.sort
+            stages.append({"$sort": {field: -1 if descending else 1}})
+        if self.max_rows is not None:
+            stages.append({"$limit": self.max_rows})
+        if self.fields is not None:
+            projection = {field.split(".")[0]: 1 for field in self.read_fields()}
+            projection["_id"] = 0
+            stages.append({"$project": projection})
+        return stages
+
+    def spark_filter(self):
+        condition = F.lit(True)
+        for field, op, value in self.conditions:
+            if op == "eq":
+                condition = condition & (F.col(field) == value)
+            elif op == "in":
+                condition = condition & F.col(field).isin(value)
+            else:
+                condition = condition & F.col(field).startswith(value)
+        return condition
+
+    def read_fields(self):
+        # The selected fields plus the sort key, which Spark needs to re-apply the ordering
+        if self.fields is None or self.sort is None:
+            return self.fields
+        return self.fields + [self.sort[0]]
+
+    def schema(self):
+        return collection_schema(self.collection, self.read_fields())
+
+    def apply(self, df):
+        df = df.filter(self.spark_filter()) if self.conditions else df
+        return self._order_and_select(df)
+
+    def _order_and_select(self, df):
+        if self.sort is not None:
+            field, descending = self.sort
+            df = df.orderBy(F.col(field).desc() if descending else F.col(field).asc())
+        if self.max_rows is not None:
+            df = df.limit(self.max_rows)
+        return df.select(*self.fields) if self.fields is not None else df
+
+    def load(self, spark):
+        df = spark.read.format(MONGO_FORMAT) \
+            .option("collection", self.collection) \
+            .option("pipeline", json.dumps(self.pipeline())) \
+            .schema(self.schema()) \
+            .load()
+        # The connector may split the pipeline results across partitions, so the
+        # sort and limit are repeated in Spark
+        return self._order_and_select(df)
@@ -1,42 +1,40 @@
+import os
 from pyspark.sql import SparkSession
 from pyspark.sql.functions import col, size, explode, count, avg, array_contains
 import time
 from pyspark.sql import functions as F
 from pyspark.sql.utils import AnalysisException
+from spark_catalog import MongoCatalog
+from mongo_query import MongoQuery
+from query_results import fetch, print_rows
+from spark_session import get_spark, mongo_uri, db_name
 
-mongo_host = "localhost"
-mongo_port = "27017"
-mongo_user = "admin"
-mongo_password = "password"
-auth_db = "admin"
-db_name = "university_mongodb"  
-try:
-    # Initialize Spark session
-    spark = SparkSession.builder \
-    .appName("SparkMongoDBExample") \
-    .config("spark.jars.packages", "org.mongodb.spark:mongo-spark-connector_2.12:3.0.1") \
-    .config("spark.mongodb.input.uri", f"mongodb://{mongo_user}:{mongo_password}@{mongo_host}:{mongo_port}/{db_name}?authSource={auth_db}") \
-    .config("spark.mongodb.output.uri", f"mongodb://{mongo_user}:{mongo_password}@{mongo_host}:{mongo_port}/{db_name}?authSource={auth_db}") \
-    .getOrCreate()
-
-    print("Session created")
+# Storage level of the collections persisted by the catalog (a pyspark StorageLevel
+# name); NONE persists nothing and every query is pushed down to MongoDB instead
+STORAGE_LEVEL = os.environ.get("SPARK_STORAGE_LEVEL", "MEMORY_AND_DISK")
 
-    
-
-    # courses_data.show()
-
-except AnalysisException as e:
-    print("Failed to connect to MongoDB:", e)
-
-except Exception as e:
-    print("An error occurred:", e)
+_catalog = None
 
 
-from pyspark.sql.functions import size
+def configure(storage_level):
+    global STORAGE_LEVEL, _catalog
+    STORAGE_LEVEL = storage_level
+    if _catalog is not None:
+        _catalog.invalidate()
+        _catalog = None
 
 
-spark.conf.set("spark.sql.adaptive.enabled", "true")
-spark.conf.set("spark.sql.adaptive.optimizerEnabled", "true")
+def get_catalog():
+    # Every query reads its collections through the catalog: each collection is loaded and
+    # persisted once per session, and reloaded only after a new migration
+    global _catalog
+    if _catalog is None:
+        spark = get_spark()
+        spark.conf.set("spark.sql.adaptive.enabled", "true")
+        spark.conf.set("spark.sql.adaptive.optimizerEnabled", "true")
+        storage_level = None if STORAGE_LEVEL.upper() == "NONE" else STORAGE_LEVEL.upper()
+        _catalog = MongoCatalog(spark, mongo_uri(""), db_name, storage_level=storage_level)
+    return _catalog
 
 
 
@@ -46,99 +44,112 @@ def get_students_in_course(course_id):
     start_time = time.time()
     
 
-    students_in_course = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
-        .option("collection", "courses") \
-        .option("pipeline", f"[{{'$match': {{ 'course_id': '{course_id}' }} }}]") \
-        .load() \
+    students_in_course = get_catalog().query(MongoQuery("courses")
+                                       .where_eq("course_id", str(course_id))
+                                       .select("enrollments")) \
         .select(explode("enrollments").alias("student")) \
         .select(col("student.student_id"), col("student.name")) \
         .distinct()
 
+    # The rows are shown and counted in one pass over the fetched result
+    count = print_rows(fetch(students_in_course))
+
+    # Timed after the actions: building the plan above does not run anything
     end_time = time.time()  # End time
     execution_time = end_time - start_time
-
-    students_in_course.show(truncate=True)
-    
-    count = students_in_course.distinct().count()
-
-    
     throughput = count / execution_time if execution_time > 0 else 0
 
     print(f"Query 1 Execution Time: {execution_time:.2f} seconds, Count: {count}, Throughput: {throughput:.2f} records/second")
 
     return count  # Count the number of distinct student IDs
 
-print(get_students_in_course(1))
-# print(get_students_in_course(5))
+
+
+def avg_students_per_instructor():
+    # Every instructor's average in one job: each (instructor, course) pair from
+    # courses_taught is joined with the per-course enrollment counts, which are
+    # small enough (one row per course) to be broadcast to every executor
+    course_sizes = get_catalog().query(MongoQuery("courses").select("course_id", "enrollments")) \
+        .select("course_id", size("enrollments").alias("num_students"))
+    instructor_courses = get_catalog().query(MongoQuery("instructors").select("instructor_id", "courses_taught")) \
+        .select("instructor_id", explode("courses_taught.course_id").alias("course_id"))
+    return instructor_courses.join(F.broadcast(course_sizes), "course_id") \
+        .groupBy("instructor_id") \
+        .agg(avg("num_students").alias("avg_students"))
 
 
 def get_avg_students_per_instructor(instructor_id):
-    # Read the instructors collection to find the courses taught by the instructor
+    # Served from the all-instructors result, computed once per data version
     start_time = time.time()
-    instructor_courses = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
-        .option("collection", "instructors") \
-        .option("pipeline", f"[{{'$match': {{ 'instructor_id': '{instructor_id}' }} }}]") \
-        .load() \
-        .select("courses_taught") \
-        .first()["courses_taught"]  # Get the array of courses taught by the instructor
-
-    # Extract course IDs from the instructor's courses_taught
-    course_ids = [course["course_id"] for course in instructor_courses]
-
-    # Read the courses collection and calculate the number of students for each course
-    avg_students_per_course = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
-        .option("collection", "courses") \
-        .option("pipeline", "[{ '$match': { '$expr': { '$in': ['$course_id', " + str(course_ids) + "] } }}]") \
-        .load() \
-        .select(size("enrollments").alias("num_students")) \
-        .agg(avg("num_students")) \
-        .first()[0]  # Get the first element from the result
+    result = get_catalog().derived("avg_students_per_instructor", avg_students_per_instructor) \
+        .filter(col("instructor_id") == str(instructor_id)) \
+        .select("avg_students") \
+        .first()
+    avg_students_per_course = result[0] if result else None
     end_time = time.time()  # End time
     execution_time = end_time - start_time
     print(f"Query 2 Execution Time: {execution_time:.2f} seconds")
     return avg_students_per_course
 
-average_students = get_avg_students_per_instructor('9')
-print(f"Average students per course for instructor 'Instructor 1': {round(average_students)}")
+
+
+# Batched variants of queries 1 and 2: one job answers every requested id
+def get_students_in_courses(course_ids=None):
+    # course_ids: list of course ids, or None for every course. Returns a lazy
+    # DataFrame: nothing runs until the caller acts on it
+    query = MongoQuery("courses").select("course_id", "enrollments")
+    if course_ids is not None:
+        query = query.where_in("course_id", [str(course_id) for course_id in course_ids])
+
+    # explode_outer keeps courses without enrollments, counted as 0
+    students_per_course = get_catalog().query(query) \
+        .select("course_id", F.explode_outer("enrollments.student_id").alias("student_id")) \
+        .groupBy("course_id") \
+        .agg(F.countDistinct("student_id").alias("num_students"))
+    return students_per_course
+
+
+def get_avg_students_per_instructors(instructor_ids=None):
+    # instructor_ids: list of instructor ids, or None for every instructor
+    avg_students = get_catalog().derived("avg_students_per_instructor", avg_students_per_instructor)
+    if instructor_ids is not None:
+        avg_students = avg_students \
+            .filter(col("instructor_id").isin([str(instructor_id) for instructor_id in instructor_ids]))
+    return avg_students
+
 
 
 
 def get_courses_in_department(department_id):
     start_time = time.time()
-    courses_in_department = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
-        .option("collection", "courses") \
-        .load() \
-        .filter(F.col("department.department_id") == department_id) \
-        .select("course_id", "name", "course_code")
+    # Filtered from the persisted courses collection, or pushed down when caching is off
+    courses_in_department = get_catalog().query(MongoQuery("courses")
+                                          .where_eq("department.department_id", department_id)
+                                          .select("course_id", "name", "course_code"))
+    courses_in_department = fetch(courses_in_department)
 
     end_time = time.time()  # End time
     execution_time = end_time - start_time
     print(f"Query 3 Execution Time: {execution_time:.2f} seconds")
     
-    return courses_in_department.collect()
+    return courses_in_department
 
-print("Courses offered by department 'CSB':")
-for course in get_courses_in_department("2"):
-    print(f"{course['name']} ({course['course_code']})")
 
 
 def get_students_per_department():
-    # Read the departments collection
+    # Read the per-department counts precomputed by the migration
     start_time = time.time()
-    students_per_department = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
-        .option("collection", "departments") \
-        .load() \
-        .select("department_id", "name", "students") \
-        .withColumn("num_students", size("students")) \
-        .select("department_id", "name", "num_students")  # Select the relevant columns
+    students_per_department = get_catalog().query(MongoQuery("stats")
+                                                  .where_eq("type", "department_students")
+                                                  .select("key", "name", "value")) \
+        .select(col("key").alias("department_id"), "name",
+                col("value").cast("int").alias("num_students"))
+    students_per_department = fetch(students_per_department)  # Arrow batch or streamed rows
     end_time = time.time()  # End time
     execution_time = end_time - start_time
     print(f"Query 4 Execution Time: {execution_time:.2f} seconds")
-    return students_per_department.collect()  # Collect the results
+    return students_per_department
 
-print("Students per department:")
-for dept in get_students_per_department():
-    print(f"{dept['name']}: {dept['num_students']} students")
 
 
 
@@ -146,11 +157,10 @@ from pyspark.sql import functions as F
 
 def count_instructors_for_cs_courses():
     start_time = time.time()
-    cs_courses = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
-        .option("collection", "courses") \
-        .load() \
-        .filter(F.col("name").startswith("CSE"))\
-        .filter(F.col("category") == "CORE")
+    cs_courses = get_catalog().query(MongoQuery("courses")
+                               .where_prefix("name", "CSE")
+                               .where_eq("Category", "CORE")
+                               .select("instructors"))
         # Filter courses starting with "CSE" and CORE 
 
     # Step 2: Explode the instructors array to create a row for each instructor
@@ -164,8 +174,6 @@ def count_instructors_for_cs_courses():
     print(f"Query 5 Execution Time: {execution_time:.2f} seconds")
     return distinct_instructors_count
 
-# Example usage
-print(f"Number of distinct instructors for courses starting with 'CSE': {count_instructors_for_cs_courses()}")
 
 
 from pyspark.sql.functions import size, col, desc, expr
@@ -174,27 +182,56 @@ import time
 def get_top_courses_by_enrollments():
     start_time = time.time()  # Start time
     
-    # First, let's fetch all courses without any limit to investigate
-    all_courses = spark.read.format("com.mongodb.spark.sql.DefaultSource") \
-        .option("collection", "courses") \
-        .load() \
-        .select("course_id", "name", "enrollments") \
-        .withColumn("enrollments_count", size(col("enrollments")))
-    
-    # Show some statistics
-    # all_courses.describe("enrollments_count").show()
-    
-    # Check for any null values in enrollments
-    null_enrollments = all_courses.filter(col("enrollments").isNull()).count()
+    # Enrollment counts are precomputed by the migration in the stats collection. With a
+    # storage level both steps filter the persisted stats in Spark; with NONE the type
+    # filter, sort and limit run in MongoDB on the {type, value} index, and the null
+    # check reads only the value of each course_enrollments document
+    null_enrollments = get_catalog().query(MongoQuery("stats")
+                                           .where_eq("type", "course_enrollments")
+                                           .select("value")) \
+        .filter(col("value").isNull()).count()
     print(f"Courses with null enrollments: {null_enrollments}")
-    top_courses = all_courses.orderBy(desc("enrollments_count")).limit(10)
+    top_courses = get_catalog().query(MongoQuery("stats")
+                                      .where_eq("type", "course_enrollments")
+                                      .order_by("value", descending=True)
+                                      .limit(10)
+                                      .select("key", "name", "value")) \
+        .select(col("key").alias("course_id"), "name",
+                col("value").cast("int").alias("enrollments_count"))
+    top_courses = fetch(top_courses)
     end_time = time.time()  # End time
     execution_time = end_time - start_time
     print(f"Query 6 Execution Time: {execution_time:.2f} seconds")
-    for course in top_courses.collect():
+    for course in top_courses:
         print(f"Course ID: {course['course_id']}, Course Name: {course['name']}, Enrollments: {course['enrollments_count']}")
 
     return top_courses
 
-# Run the function
-get_top_courses_by_enrollments()
\ No newline at end of file
+
+def main():
+    print(get_students_in_course(1))
+    # print(get_students_in_course(5))
+
+    average_students = get_avg_students_per_instructor('9')
+    print(f"Average students per course for instructor 'Instructor 1': {round(average_students)}")
+
+    # Batched versions: one job for many ids
+    get_students_in_courses([1, 5]).show()
+    get_avg_students_per_instructors().show()
+
+    print("Courses offered by department 'CSB':")
+    for course in get_courses_in_department("2"):
+        print(f"{course['name']} ({course['course_code']})")
+
+    print("Students per department:")
+    for dept in get_students_per_department():
+        print(f"{dept['name']}: {dept['num_students']} students")
+
+    # Example usage
+    print(f"Number of distinct instructors for courses starting with 'CSE': {count_instructors_for_cs_courses()}")
+
+    # Run the function
+    get_top_courses_by_enrollments()
+
+if __name__ == "__main__":
+    main()
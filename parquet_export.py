@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import pyarrow as pa
+import pyarrow.dataset as ds
+import db_connections
+
+# Columnar copy of the migrated collections for Spark analytics. The embedded
+# enrollments/instructors arrays of courses become edge tables, and every table is
+# written as Parquet under <dir>/<table>/department_id=<id>/ so that filters on
+# department_id only open the matching directories.
+PARQUET_BATCH_SIZE = 50000
+MANIFEST = "manifest.json"
+
+PARTITIONING = ds.partitioning(pa.schema([("department_id", pa.string())]), flavor="hive")
+
+
+def department_id(doc):
+    return (doc.get("department") or {}).get("department_id")
+
+
+def department_rows(doc):
+    yield {"department_id": doc["department_id"], "name": doc["name"],
+           "num_courses": len(doc.get("courses") or []),
+           "num_instructors": len(doc.get("instructors") or []),
+           "num_students": len(doc.get("students") or [])}
+
+
+def member_rows(key):
+    def rows(doc):
+        yield {key: doc[key], "name": doc["name"], "email": doc.get("email"), "department_id": department_id(doc)}
+    return rows
+
+
+def course_rows(doc):
+    enrollments = doc.get("enrollments")
+    yield {"course_id": doc["course_id"], "name": doc["name"], "course_code": doc.get("course_code"),
+           "category": doc.get("Category"), "department_id": department_id(doc),
+           "num_instructors": len(doc.get("instructors") or []),
+           # A missing enrollments array stays null, as Query 6 reports those courses
+           "num_students": None if enrollments is None else len(enrollments)}
+
+
+def edge_rows(array, key):
+    # One row per embedded element, partitioned by the course's department
+    def rows(doc):
+        for item in doc.get(array) or []:
+            yield {"course_id": doc["course_id"], key: item[key], "name": item.get("name"),
+                   "department_id": department_id(doc)}
+    return rows
+
+
+# table: (source collection, row function, schema)
+PARQUET_TABLES = {
+    "departments": ("departments", department_rows, pa.schema([
+        ("department_id", pa.string()), ("name", pa.string()), ("num_courses", pa.int32()),
+        ("num_instructors", pa.int32()), ("num_students", pa.int32())])),
+    "instructors": ("instructors", member_rows("instructor_id"), pa.schema([
+        ("instructor_id", pa.string()), ("name", pa.string()), ("email", pa.string()),
+        ("department_id", pa.string())])),
+    "students": ("students", member_rows("student_id"), pa.schema([
+        ("student_id", pa.string()), ("name", pa.string()), ("email", pa.string()),
+        ("department_id", pa.string())])),
+    "courses": ("courses", course_rows, pa.schema([
+        ("course_id", pa.string()), ("name", pa.string()), ("course_code", pa.string()),
+        ("category", pa.string()), ("department_id", pa.string()),
+        ("num_instructors", pa.int32()), ("num_students", pa.int32())])),
+    "course_instructors": ("courses", edge_rows("instructors", "instructor_id"), pa.schema([
+        ("course_id", pa.string()), ("instructor_id", pa.string()), ("name", pa.string()),
+        ("department_id", pa.string())])),
+    "course_enrollments": ("courses", edge_rows("enrollments", "student_id"), pa.schema([
+        ("course_id", pa.string()), ("student_id", pa.string()), ("name", pa.string()),
+        ("department_id", pa.string())])),
+}
+
+
+# Unique key of each source collection (indexed by the migration)
+SORT_KEYS = {"departments": "department_id", "instructors": "instructor_id",
+             "students": "student_id", "courses": "course_id"}
+
+
+def record_batches(mongo_db, collection, row_function, schema, counter):
+    # Documents are read in key order through the unique index, so the Parquet
+    # min/max statistics of each row group cover a narrow id range
+    rows = []
+    cursor = mongo_db[collection].find({}, {"_id": 0}, batch_size=PARQUET_BATCH_SIZE).sort(SORT_KEYS[collection], 1)
+    for doc in cursor:
+        rows.extend(row_function(doc))
+        if len(rows) >= PARQUET_BATCH_SIZE:
+            counter[0] += len(rows)
+            yield pa.RecordBatch.from_pylist(rows, schema=schema)
+            rows = []
+    if rows:
+        counter[0] += len(rows)
+        yield pa.RecordBatch.from_pylist(rows, schema=schema)
+
+
+def export_table(mongo_db, output_dir, table, compression="zstd"):
+    collection, row_function, schema = PARQUET_TABLES[table]
+    start_time = time.time()
+    counter = [0]
+    # Written to a fresh directory that then replaces the previous export of the table,
+    # so partitions of departments that no longer exist do not survive a re-export
+    table_dir = os.path.join(output_dir, table)
+    staging_dir = table_dir + ".tmp"
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)   # Kept even when the table has no rows
+    ds.write_dataset(record_batches(mongo_db, collection, row_function, schema, counter),
+                     staging_dir,
+                     schema=schema,
+                     format="parquet",
+                     partitioning=PARTITIONING,
+                     file_options=ds.ParquetFileFormat().make_write_options(compression=compression))
+    shutil.rmtree(table_dir, ignore_errors=True)
+    os.replace(staging_dir, table_dir)
+    print(f"Parquet {table}: {counter[0]} rows in {time.time() - start_time:.2f} seconds")
+    return counter[0]
+
+
+def export_collections(mongo_db, output_dir, data_version=None, compression="zstd"):
+    os.makedirs(output_dir, exist_ok=True)
+    if data_version is None:
+        meta = mongo_db.migration_meta.find_one({"_id": "data_version"})
+        data_version = meta["version"] if meta else None
+    tables = {table: {"rows": export_table(mongo_db, output_dir, table, compression)} for table in PARQUET_TABLES}
+    # The data version lets readers tell whether the export matches the live collections
+    with open(os.path.join(output_dir, MANIFEST), "w") as f:
+        json.dump({"data_version": data_version, "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "partitioned_by": "department_id", "tables": tables}, f, indent=2)
+    return tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the migrated MongoDB collections to partitioned Parquet")
+    parser.add_argument("output_dir", help="directory to write the Parquet tables to")
+    parser.add_argument("--compression", default="zstd", help="Parquet compression codec")
+    args = parser.parse_args()
+    try:
+        export_collections(db_connections.get_mongo_db(), args.output_dir, compression=args.compression)
+    finally:
+        db_connections.close_all()
+
+
+if __name__ == "__main__":
+    main()
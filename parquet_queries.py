@@ -0,0 +1,118 @@
+import os
+import time
+from pyspark.sql import functions as F
+from pyspark.sql.functions import col, avg, desc
+from spark_session import get_spark
+
+# The six queries answered from the Parquet export written by parquet_export.py.
+# Filters on department_id prune whole partition directories; the other filters
+# are pushed down to the Parquet readers and skip row groups by their statistics.
+PARQUET_DIR = os.environ.get("PARQUET_DIR", "parquet")
+
+_tables = {}
+
+
+def configure(parquet_dir):
+    global PARQUET_DIR
+    PARQUET_DIR = parquet_dir
+    _tables.clear()
+
+
+def read_table(table):
+    if table not in _tables:
+        spark = get_spark()
+        # Keep department_id a string, as it is in MongoDB
+        spark.conf.set("spark.sql.sources.partitionColumnTypeInference.enabled", "false")
+        _tables[table] = spark.read.parquet(os.path.join(PARQUET_DIR, table))
+    return _tables[table]
+
+
+# 1. Fetching the number of students enrolled in a specific course
+def get_students_in_course(course_id):
+    start_time = time.time()
+    count = read_table("course_enrollments") \
+        .filter(col("course_id") == str(course_id)) \
+        .select("student_id") \
+        .distinct() \
+        .count()
+    end_time = time.time()  # End time
+    execution_time = end_time - start_time
+    throughput = count / execution_time if execution_time > 0 else 0
+    print(f"Query 1 Execution Time: {execution_time:.2f} seconds, Count: {count}, Throughput: {throughput:.2f} records/second")
+    return count
+
+
+def get_avg_students_per_instructor(instructor_id):
+    start_time = time.time()
+    # The instructor's courses joined with their enrollment counts, in one job
+    instructor_courses = read_table("course_instructors") \
+        .filter(col("instructor_id") == str(instructor_id)) \
+        .select("course_id") \
+        .distinct()
+    avg_students_per_course = read_table("courses") \
+        .select("course_id", F.coalesce(col("num_students"), F.lit(0)).alias("num_students")) \
+        .join(instructor_courses, "course_id") \
+        .agg(avg("num_students")) \
+        .first()[0]
+    end_time = time.time()  # End time
+    execution_time = end_time - start_time
+    print(f"Query 2 Execution Time: {execution_time:.2f} seconds")
+    return avg_students_per_course
+
+
+def get_courses_in_department(department_id):
+    start_time = time.time()
+    # Partition pruning: only the department_id=<id> directory is read
+    courses_in_department = read_table("courses") \
+        .filter(col("department_id") == department_id) \
+        .select("course_id", "name", "course_code") \
+        .collect()
+    end_time = time.time()  # End time
+    execution_time = end_time - start_time
+    print(f"Query 3 Execution Time: {execution_time:.2f} seconds")
+    return courses_in_department
+
+
+def get_students_per_department():
+    start_time = time.time()
+    students_per_department = read_table("departments") \
+        .select("department_id", "name", "num_students") \
+        .collect()
+    end_time = time.time()  # End time
+    execution_time = end_time - start_time
+    print(f"Query 4 Execution Time: {execution_time:.2f} seconds")
+    return students_per_department
+
+
+def count_instructors_for_cs_courses():
+    start_time = time.time()
+    cs_courses = read_table("courses") \
+        .filter(col("name").startswith("CSE") & (col("category") == "CORE")) \
+        .select("course_id")
+    distinct_instructors_count = read_table("course_instructors") \
+        .join(cs_courses, "course_id", "left_semi") \
+        .select("instructor_id") \
+        .distinct() \
+        .count()
+    end_time = time.time()  # End time
+    execution_time = end_time - start_time
+    print(f"Query 5 Execution Time: {execution_time:.2f} seconds")
+    return distinct_instructors_count
+
+
+def get_top_courses_by_enrollments():
+    start_time = time.time()
+    # Only the num_students column is read for the null check
+    courses = read_table("courses")
+    null_enrollments = courses.filter(col("num_students").isNull()).count()
+    print(f"Courses with null enrollments: {null_enrollments}")
+    top_courses = courses.select("course_id", "name", col("num_students").alias("enrollments_count")) \
+        .orderBy(desc("enrollments_count")) \
+        .limit(10)
+    rows = top_courses.collect()
+    end_time = time.time()  # End time
+    execution_time = end_time - start_time
+    print(f"Query 6 Execution Time: {execution_time:.2f} seconds")
+    for course in rows:
+        print(f"Course ID: {course['course_id']}, Course Name: {course['name']}, Enrollments: {course['enrollments_count']}")
+    return rows
@@ -1,3 +1,11 @@
+import argparse
+import io
+import time
+import multiprocessing
+import struct
+import zlib
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 import psycopg2
 from psycopg2.extras import execute_batch
 from faker import Faker
@@ -8,23 +16,21 @@ fake = Faker()
 Faker.seed(random.randint(1, 10000))
 random.seed(random.randint(1, 10000))
 
-# PostgreSQL connection parameters
-pg_params = {
-    "dbname": "university",
-    "user": "admin",
-    "password": "password",
-    "host": "localhost",
-    "port": "5432"
-}
-
-
 num_instructors = 100
 num_students=2000
 num_courses=50
 
-def create_tables(conn):
+# Load generated rows with COPY ... FROM STDIN instead of one INSERT per row
+BULK_LOAD = False
+# Rows sent per COPY statement
+COPY_CHUNK_SIZE = 50000
+
+def create_tables(conn, deferred=False, unlogged=False):
+    if deferred:
+        create_bare_tables(conn, unlogged)
+        return
     with conn.cursor() as cur:
-        cur.execute("""
+        ddl = """
         DROP TABLE IF EXISTS Departments CASCADE;
         CREATE TABLE IF NOT EXISTS Departments (
             department_id SERIAL PRIMARY KEY,
@@ -64,21 +70,166 @@ def create_tables(conn):
             course_id INT REFERENCES Courses(course_id) ON DELETE CASCADE,
             PRIMARY KEY (student_id, course_id)
         );
+        """
+        cur.execute(ddl.replace("CREATE TABLE", "CREATE UNLOGGED TABLE") if unlogged else ddl)
+
+# Bulk seeding: tables are created without keys, constraints or change-log triggers,
+# loaded, and only then constrained, so no generated row pays for index upkeep or FK checks
+bare_tables = {
+    "Departments": "department_id SERIAL, department_name VARCHAR(100) NOT NULL",
+    "Instructors": "instructor_id SERIAL, name VARCHAR(100) NOT NULL, email VARCHAR(100) NOT NULL, department_id INT",
+    "Students": "student_id SERIAL, name VARCHAR(100) NOT NULL, email VARCHAR(100) NOT NULL, department_id INT",
+    "Courses": "course_id SERIAL, course_name VARCHAR(100) NOT NULL, course_code VARCHAR(10) NOT NULL, "
+               "department_id INT, is_elective VARCHAR(10) NOT NULL",
+    "Course_Instructors": "course_id INT, instructor_id INT",
+    "Enrollments": "student_id INT, course_id INT",
+}
+
+# One ALTER TABLE per table, in dependency order so referenced keys exist first
+deferred_constraints = {
+    "Departments": ["PRIMARY KEY (department_id)", "UNIQUE (department_name)"],
+    "Instructors": ["PRIMARY KEY (instructor_id)", "UNIQUE (email)",
+                    "FOREIGN KEY (department_id) REFERENCES Departments(department_id) ON DELETE CASCADE"],
+    "Students": ["PRIMARY KEY (student_id)", "UNIQUE (email)",
+                 "FOREIGN KEY (department_id) REFERENCES Departments(department_id) ON DELETE SET NULL"],
+    "Courses": ["PRIMARY KEY (course_id)", "UNIQUE (course_code)",
+                "FOREIGN KEY (department_id) REFERENCES Departments(department_id) ON DELETE CASCADE"],
+    "Course_Instructors": ["PRIMARY KEY (course_id, instructor_id)",
+                           "FOREIGN KEY (course_id) REFERENCES Courses(course_id) ON DELETE CASCADE",
+                           "FOREIGN KEY (instructor_id) REFERENCES Instructors(instructor_id) ON DELETE CASCADE"],
+    "Enrollments": ["PRIMARY KEY (student_id, course_id)",
+                    "FOREIGN KEY (student_id) REFERENCES Students(student_id) ON DELETE CASCADE",
+                    "FOREIGN KEY (course_id) REFERENCES Courses(course_id) ON DELETE CASCADE"],
+}
+
+def create_bare_tables(conn, unlogged=False):
+    with conn.cursor() as cur:
+        for table, columns in bare_tables.items():
+            cur.execute(f"DROP TABLE IF EXISTS {table} CASCADE;")
+            cur.execute(f"CREATE {'UNLOGGED ' if unlogged else ''}TABLE {table} ({columns});")
+
+def add_deferred_constraints(conn):
+    # Returns the time spent per phase
+    phase_times = {}
+    with conn.cursor() as cur:
+        for table, constraints in deferred_constraints.items():
+            start_time = time.time()
+            cur.execute(f"ALTER TABLE {table} " + ", ".join(f"ADD {constraint}" for constraint in constraints))
+            conn.commit()
+            phase_times[f"constraints {table}"] = time.time() - start_time
+
+        start_time = time.time()
+        create_change_log(cur)
+        conn.commit()
+        phase_times["change log triggers"] = time.time() - start_time
+
+    # ANALYZE cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        start_time = time.time()
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE;")
+        phase_times["analyze"] = time.time() - start_time
+    finally:
+        conn.autocommit = False
+    return phase_times
+
+# Row-level triggers record every insert/update/delete so data_migration.py can
+# apply only the changes since its last run (incremental mode). Each row keeps the
+# id of the transaction that wrote it, so readers can order their watermark by
+# transaction visibility rather than by change_id, which is assigned before commit.
+# Change_Log_Epoch holds a random id that changes whenever the log is recreated.
+change_logged_tables = ["Departments", "Instructors", "Students", "Courses", "Course_Instructors", "Enrollments"]
+
+def create_change_log(cur):
+    cur.execute("""
+    DROP TABLE IF EXISTS Change_Log CASCADE;
+    CREATE TABLE IF NOT EXISTS Change_Log (
+        change_id BIGSERIAL PRIMARY KEY,
+        table_name VARCHAR(50) NOT NULL,
+        operation VARCHAR(10) NOT NULL,   -- INSERT, UPDATE or DELETE
+        old_row JSONB,
+        new_row JSONB,
+        txid BIGINT NOT NULL DEFAULT pg_current_xact_id()::text::bigint,
+        changed_at TIMESTAMP NOT NULL DEFAULT now()
+    );
+    CREATE INDEX change_log_txid ON Change_Log (txid);
+    DROP TABLE IF EXISTS Change_Log_Epoch;
+    CREATE TABLE Change_Log_Epoch (epoch TEXT NOT NULL);
+    INSERT INTO Change_Log_Epoch (epoch) VALUES (gen_random_uuid()::text);
+    CREATE OR REPLACE FUNCTION log_change() RETURNS TRIGGER AS $$
+    BEGIN
+        INSERT INTO Change_Log (table_name, operation, old_row, new_row)
+        VALUES (TG_TABLE_NAME, TG_OP,
+                CASE WHEN TG_OP <> 'INSERT' THEN to_jsonb(OLD) END,
+                CASE WHEN TG_OP <> 'DELETE' THEN to_jsonb(NEW) END);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    for table in change_logged_tables:
+        cur.execute(f"""
+        CREATE TRIGGER {table.lower()}_change_log
+        AFTER INSERT OR UPDATE OR DELETE ON {table}
+        FOR EACH ROW EXECUTE FUNCTION log_change();
         """)
 import random
-from psycopg2 import connect, sql
+import snapshots
+from db_connections import pg_connection, close_all
 
 predefined_departments = ["CSE", "CSB", "CSAI", "CSAM", "CSSS", "CSD", "ECE", "EVE"]
 
+def copy_value(value):
+    # Escape a value for COPY's text format
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+def copy_rows(cur, table, columns, rows, chunk_size=None):
+    # Stream rows into the table through COPY, chunk_size rows per in-memory buffer
+    chunk_size = chunk_size or COPY_CHUNK_SIZE
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    buffer = io.StringIO()
+    pending = 0
+    total = 0
+    for row in rows:
+        buffer.write("\t".join(copy_value(value) for value in row) + "\n")
+        pending += 1
+        if pending >= chunk_size:
+            buffer.seek(0)
+            cur.copy_expert(statement, buffer)
+            total += pending
+            buffer = io.StringIO()
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cur.copy_expert(statement, buffer)
+        total += pending
+    return total
+
+def insert_rows(cur, table, columns, rows, conflict_target):
+    # COPY has no ON CONFLICT, so every generator yields rows that are already unique
+    if BULK_LOAD:
+        return copy_rows(cur, table, columns, rows)
+    count = 0
+    for row in rows:
+        cur.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join(['%s'] * len(columns))})
+            ON CONFLICT {conflict_target} DO NOTHING
+        """, row)
+        count += 1
+    return count
+
 def generate_departments(conn):
     with conn.cursor() as cur:
-        for department in predefined_departments:
-            cur.execute("INSERT INTO Departments (department_name) VALUES (%s) ON CONFLICT DO NOTHING;", (department,))
+        insert_rows(cur, "Departments", ["department_name"],
+                    ((department,) for department in predefined_departments), "")
     conn.commit()
     print("DONE 1")
 
-def assign_even_distribution(items, total):
-    random.shuffle(items)
+def assign_even_distribution(items, total, rng=random):
+    rng.shuffle(items)
     groups = [items[i::total] for i in range(total)]
     
     return groups
@@ -89,13 +240,10 @@ def generate_instructors(conn, num_instructors):
         department_ids = [i + 1 for i in range(len(predefined_departments))]
         instructors_per_department = assign_even_distribution(list(range(1, num_instructors + 1)), len(department_ids))
 
-        for idx, department_group in enumerate(instructors_per_department):
-            for instructor in department_group:
-                cur.execute("""
-                    INSERT INTO Instructors (name, email, department_id)
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT (email) DO NOTHING
-                """, (f"Instructor_{instructor}", f"instructor_{instructor}@university.edu", department_ids[idx]))
+        rows = ((f"Instructor_{instructor}", f"instructor_{instructor}@university.edu", department_ids[idx])
+                for idx, department_group in enumerate(instructors_per_department)
+                for instructor in department_group)
+        insert_rows(cur, "Instructors", ["name", "email", "department_id"], rows, "(email)")
     conn.commit()
     print("DONE 2")
 
@@ -105,39 +253,40 @@ def generate_students(conn, num_students):
         department_ids = [i + 1 for i in range(len(predefined_departments))]
         students_per_department = assign_even_distribution(list(range(1, num_students + 1)), len(department_ids))
 
-        for idx, department_group in enumerate(students_per_department):
-            for student in department_group:
-                cur.execute("""
-                    INSERT INTO Students (name, email, department_id)
-                    VALUES (%s, %s, %s)
-                    ON CONFLICT (email) DO NOTHING
-                """, (f"Student_{student}", f"student_{student}@university.edu", department_ids[idx]))
+        rows = ((f"Student_{student}", f"student_{student}@university.edu", department_ids[idx])
+                for idx, department_group in enumerate(students_per_department)
+                for student in department_group)
+        insert_rows(cur, "Students", ["name", "email", "department_id"], rows, "(email)")
     conn.commit()
     print("DONE 3")
 
+def course_rows(departments, num_courses):
+    seen_codes = set()
+    for _ in range(num_courses):
+        # Randomly select a department
+        department_id, department_name = random.choice(departments)  
+
+        # Generate a unique course code and name
+        course_number = random.randint(100, 999)  # Generate a random three-digit number
+        course_code = f"{department_name[:3].upper()}{course_number}"  # First 3 letters of the department name
+        course_name = f"{department_name} Course {course_number}"  # Set a course name based on the department
+
+        is_elective = random.choice(["CORE", "ELECTIVE"])
+
+        # Skip duplicate codes, as ON CONFLICT (course_code) DO NOTHING would
+        if course_code not in seen_codes:
+            seen_codes.add(course_code)
+            yield (course_name, course_code, department_id, is_elective)
+
 def generate_courses(conn, num_courses):
     with conn.cursor() as cur:
         # Retrieve department IDs and names
         cur.execute("SELECT department_id, department_name FROM Departments;")
         departments = cur.fetchall()
 
-        for _ in range(num_courses):
-            # Randomly select a department
-            department_id, department_name = random.choice(departments)  
-
-            # Generate a unique course code and name
-            course_number = random.randint(100, 999)  # Generate a random three-digit number
-            course_code = f"{department_name[:3].upper()}{course_number}"  # First 3 letters of the department name
-            course_name = f"{department_name} Course {course_number}"  # Set a course name based on the department
-
-            is_elective = random.choice(["CORE", "ELECTIVE"])
-
-            # Insert into Courses table
-            cur.execute("""
-                INSERT INTO Courses (course_name, course_code, department_id, is_elective)
-                VALUES (%s, %s, %s, %s)
-                ON CONFLICT (course_code) DO NOTHING
-            """, (course_name, course_code, department_id, is_elective))
+        # Insert into Courses table
+        insert_rows(cur, "Courses", ["course_name", "course_code", "department_id", "is_elective"],
+                    course_rows(departments, num_courses), "(course_code)")
 
     conn.commit()
 
@@ -149,15 +298,11 @@ def map_courses_instructors(conn):
         cur.execute("SELECT instructor_id FROM Instructors;")
         instructors = [row[0] for row in cur.fetchall()]
 
-        for course_id in courses:
-            # Randomly assign instructors from the same department for the course
-            assigned_instructors = random.sample(instructors, k=random.randint(5, 10))  # Randomly assign 5 to 10 instructors
-            for instructor_id in assigned_instructors:
-                cur.execute("""
-                    INSERT INTO Course_Instructors (course_id, instructor_id)
-                    VALUES (%s, %s)
-                    ON CONFLICT (course_id, instructor_id) DO NOTHING
-                """, (course_id, instructor_id))  # Ignore duplicates
+        # Randomly assign 5 to 10 distinct instructors to each course
+        rows = ((course_id, instructor_id)
+                for course_id in courses
+                for instructor_id in random.sample(instructors, k=random.randint(5, 10)))
+        insert_rows(cur, "Course_Instructors", ["course_id", "instructor_id"], rows, "(course_id, instructor_id)")
     conn.commit()
 
     print("DONE 5")
@@ -174,21 +319,231 @@ def generate_enrollments(conn):
         min_courses = 25
         max_courses = 30
 
-        for student_id in students:
-            num_courses_for_student = random.randint(min_courses, max_courses)
-            student_courses = random.sample(courses, num_courses_for_student)
-            for course_id in student_courses:
-                # Use ON CONFLICT to ignore duplicate entries
-                cur.execute("""
-                    INSERT INTO Enrollments (student_id, course_id) 
-                    VALUES (%s, %s)
-                    ON CONFLICT (student_id, course_id) DO NOTHING
-                """, (student_id, course_id))
+        # random.sample never repeats a course for the same student
+        rows = ((student_id, course_id)
+                for student_id in students
+                for course_id in random.sample(courses, random.randint(min_courses, max_courses)))
+        insert_rows(cur, "Enrollments", ["student_id", "course_id"], rows, "(student_id, course_id)")
 
     conn.commit()
     print("DONE 6")
 
 
+
+# Scaled, deterministic generation: row counts are multiplied by a scale factor and
+# every table is cut into fixed-size id ranges, each generated from its own seed,
+# so the same seed and scale factor give identical rows whatever the worker count
+
+# Rows per generated partition; part of the dataset definition, changing it changes the data
+PARTITION_SIZE = 50000
+
+def scaled_counts(scale_factor):
+    return {
+        "instructors": max(10, round(num_instructors * scale_factor)),
+        "students": max(1, round(num_students * scale_factor)),
+        "courses": max(30, round(num_courses * scale_factor)),
+    }
+
+def partition_rng(seed, table, partition):
+    return random.Random(f"{seed}:{table}:{partition}")
+
+def id_partitions(count):
+    return [(partition, low, min(low + PARTITION_SIZE - 1, count))
+            for partition, low in enumerate(range(1, count + 1, PARTITION_SIZE))]
+
+def scaled_instructor_rows(rng, low, high, counts):
+    department_ids = [i + 1 for i in range(len(predefined_departments))]
+    groups = assign_even_distribution(list(range(low, high + 1)), len(department_ids), rng)
+    rows = [(instructor, f"Instructor_{instructor}", f"instructor_{instructor}@university.edu", department_ids[idx])
+            for idx, group in enumerate(groups) for instructor in group]
+    return sorted(rows)
+
+def scaled_student_rows(rng, low, high, counts):
+    department_ids = [i + 1 for i in range(len(predefined_departments))]
+    groups = assign_even_distribution(list(range(low, high + 1)), len(department_ids), rng)
+    rows = [(student, f"Student_{student}", f"student_{student}@university.edu", department_ids[idx])
+            for idx, group in enumerate(groups) for student in group]
+    return sorted(rows)
+
+def scaled_course_rows(rng, low, high, counts):
+    for course_id in range(low, high + 1):
+        department_id = rng.randint(1, len(predefined_departments))
+        department_name = predefined_departments[department_id - 1]
+        course_number = 99 + course_id   # Derived from the id so codes stay unique at any scale
+        yield (course_id, f"{department_name} Course {course_number}",
+               f"{department_name[:3].upper()}{course_number}", department_id, rng.choice(["CORE", "ELECTIVE"]))
+
+def scaled_course_instructor_rows(rng, low, high, counts):
+    instructors = range(1, counts["instructors"] + 1)
+    for course_id in range(low, high + 1):
+        for instructor_id in sorted(rng.sample(instructors, k=rng.randint(5, 10))):
+            yield (course_id, instructor_id)
+
+def scaled_enrollment_rows(rng, low, high, counts):
+    courses = range(1, counts["courses"] + 1)
+    for student_id in range(low, high + 1):
+        for course_id in sorted(rng.sample(courses, rng.randint(25, 30))):
+            yield (student_id, course_id)
+
+# table -> (row generator, columns, table whose ids are partitioned)
+SCALED_TABLES = {
+    "Instructors": (scaled_instructor_rows, ["instructor_id", "name", "email", "department_id"], "instructors"),
+    "Students": (scaled_student_rows, ["student_id", "name", "email", "department_id"], "students"),
+    "Courses": (scaled_course_rows, ["course_id", "course_name", "course_code", "department_id", "is_elective"], "courses"),
+    "Course_Instructors": (scaled_course_instructor_rows, ["course_id", "instructor_id"], "courses"),
+    "Enrollments": (scaled_enrollment_rows, ["student_id", "course_id"], "students"),
+}
+
+# Vectorized sampling for the link tables: whole blocks of students/courses draw
+# their distinct courses/instructors at once with NumPy and are COPYed in binary
+# format, so no Python code runs per generated row
+
+# Values drawn per block (block rows x max_k), bounds the block's memory
+SAMPLE_BLOCK_CELLS = 4000000
+
+# Populations smaller than this many times max_k rank random keys instead of drawing
+# values, as more than half of the redrawn values would collide
+SAMPLE_RANK_RATIO = 2
+
+def sample_row_cells(population, max_k):
+    # Values held per owner by sample_distinct
+    return population if population < SAMPLE_RANK_RATIO * max_k else max_k
+
+def sample_distinct(rng, num_owners, population, min_k, max_k):
+    # For each owner pick k in [min_k, max_k] distinct values from 1..population.
+    # Each row draws max_k values with replacement, then only the cells repeating a
+    # value already in their row are drawn again until every row is distinct; each
+    # redrawn cell collides with probability below 1 / SAMPLE_RANK_RATIO, so the
+    # passes shrink geometrically. Which cells are redrawn depends only on where the
+    # row's values are equal, never on the values themselves, so the first k cells
+    # of a row hold a uniform random subset.
+    k = rng.integers(min_k, max_k + 1, size=num_owners)
+    if population < SAMPLE_RANK_RATIO * max_k:
+        # Small populations: rank random keys instead
+        keys = rng.random((num_owners, population), dtype=np.float32)
+        draws = np.argsort(keys, axis=1)[:, :max_k].astype(np.int32) + 1
+    else:
+        draws = rng.integers(1, population + 1, size=(num_owners, max_k), dtype=np.int32)
+        pending = np.arange(num_owners)
+        while len(pending):
+            rows = draws[pending]
+            # A stable sort keeps equal values in cell order: every occurrence after
+            # the first is a repeat
+            order = np.argsort(rows, axis=1, kind="stable")
+            ordered = np.take_along_axis(rows, order, axis=1)
+            repeat_rows, repeat_cols = np.nonzero(ordered[:, 1:] == ordered[:, :-1])
+            rows[repeat_rows, order[repeat_rows, repeat_cols + 1]] = \
+                rng.integers(1, population + 1, size=len(repeat_rows), dtype=np.int32)
+            draws[pending] = rows
+            pending = pending[np.unique(repeat_rows)]
+    # Keep the first k values of each row, listed in ascending order
+    mask = np.arange(max_k) < k[:, None]
+    chosen = np.sort(np.where(mask, draws, np.iinfo(np.int32).max), axis=1)
+    owners = np.repeat(np.arange(num_owners, dtype=np.int32), k)
+    return owners, chosen[mask]
+
+def copy_int_columns(cur, table, columns, arrays):
+    # COPY's binary format built with a structured array: per row a field count,
+    # then a length and a big-endian int4 per column
+    dtype = [("fields", ">i2")] + [field for i in range(len(columns))
+                                   for field in ((f"len{i}", ">i4"), (f"value{i}", ">i4"))]
+    rows = np.empty(len(arrays[0]), dtype=dtype)
+    rows["fields"] = len(columns)
+    for i, array in enumerate(arrays):
+        rows[f"len{i}"] = 4
+        rows[f"value{i}"] = array
+    payload = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0) + rows.tobytes() + struct.pack(">h", -1)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)", io.BytesIO(payload))
+    return len(rows)
+
+# table -> (population the values are drawn from, min_k, max_k); the owners are the
+# ids the table is partitioned by in SCALED_TABLES
+VECTORIZED_TABLES = {
+    "Course_Instructors": ("instructors", 5, 10),
+    "Enrollments": ("courses", 25, 30),
+}
+
+def load_vectorized_partition(cur, table, partition, low, high, seed, counts):
+    population_table, min_k, max_k = VECTORIZED_TABLES[table]
+    population = counts[population_table]
+    rng = np.random.default_rng([seed, zlib.crc32(table.encode()), partition])
+    block = max(1, SAMPLE_BLOCK_CELLS // sample_row_cells(population, max_k))
+    count = 0
+    for block_low in range(low, high + 1, block):
+        num_owners = min(block, high + 1 - block_low)
+        owners, values = sample_distinct(rng, num_owners, population, min_k, max_k)
+        count += copy_int_columns(cur, table, SCALED_TABLES[table][1], [owners + block_low, values])
+    return count
+
+def load_partition(table, partition, low, high, seed, counts, chunk_size, vectorized=False):
+    # Runs in a worker process with its own pooled connection
+    rows_for, columns, _ = SCALED_TABLES[table]
+    with pg_connection() as conn:
+        with conn.cursor() as cur:
+            if vectorized and table in VECTORIZED_TABLES:
+                count = load_vectorized_partition(cur, table, partition, low, high, seed, counts)
+            else:
+                rng = partition_rng(seed, table, partition)
+                count = copy_rows(cur, table, columns, rows_for(rng, low, high, counts), chunk_size)
+        conn.commit()
+    return count
+
+def load_tables_in_parallel(tables, seed, counts, workers, vectorized=False):
+    jobs = [(table, partition, low, high)
+            for table in tables
+            for partition, low, high in id_partitions(counts[SCALED_TABLES[table][2]])]
+    # spawn: children must not share the parent's pooled connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(load_partition, table, partition, low, high, seed, counts, COPY_CHUNK_SIZE, vectorized)
+                   for table, partition, low, high in jobs]
+        loaded = {}
+        for (table, *_), future in zip(jobs, futures):
+            loaded[table] = loaded.get(table, 0) + future.result()
+    for table in tables:
+        print(f"{table}: {loaded.get(table, 0)} rows in {len([job for job in jobs if job[0] == table])} partitions")
+
+def reset_sequences(conn):
+    # Ids were loaded explicitly, move the SERIAL sequences past them
+    with conn.cursor() as cur:
+        for table, key in (("Departments", "department_id"), ("Instructors", "instructor_id"),
+                           ("Students", "student_id"), ("Courses", "course_id")):
+            cur.execute(f"SELECT setval(pg_get_serial_sequence('{table}', '{key}'), "
+                        f"COALESCE((SELECT MAX({key}) FROM {table}), 0) + 1, false)")
+    conn.commit()
+
+def generate_scaled(conn, seed, scale_factor, workers, vectorized=False):
+    counts = scaled_counts(scale_factor)
+    print(f"Scale factor {scale_factor}, seed {seed}: {counts}")
+    with conn.cursor() as cur:
+        copy_rows(cur, "Departments", ["department_id", "department_name"],
+                  ((idx + 1, department) for idx, department in enumerate(predefined_departments)))
+    conn.commit()
+
+    # Referenced tables first, then the two link tables
+    load_tables_in_parallel(["Instructors", "Students", "Courses"], seed, counts, workers)
+    load_tables_in_parallel(["Course_Instructors", "Enrollments"], seed, counts, workers, vectorized)
+    reset_sequences(conn)
+
+def restore_snapshot(conn, snapshot_dir):
+    # COPY a Parquet snapshot into bare tables; constraints are added afterwards
+    create_bare_tables(conn)
+    with conn.cursor() as cur:
+        for table, schema in snapshots.RELATIONAL_SCHEMAS.items():
+            count = copy_rows(cur, table, schema.names, snapshots.read_relational(snapshot_dir, table))
+            print(f"{table}: {count} rows restored")
+    conn.commit()
+    reset_sequences(conn)
+
+def dataset_checksum(conn):
+    # Order-independent digest of every table, to compare datasets across runs
+    checksums = {}
+    with conn.cursor() as cur:
+        for table in ["Departments", "Instructors", "Students", "Courses", "Course_Instructors", "Enrollments"]:
+            cur.execute(f"SELECT md5(string_agg(md5(t::text), '' ORDER BY md5(t::text))) FROM {table} t")
+            checksums[table] = cur.fetchone()[0]
+    return checksums
+
+
 def clear_tables(conn):
     with conn.cursor() as cur:
         cur.execute("DROP TABLE IF EXISTS Enrollments CASCADE;")
@@ -197,22 +552,110 @@ def clear_tables(conn):
         cur.execute("DROP TABLE IF EXISTS Students CASCADE;")
         cur.execute("DROP TABLE IF EXISTS Instructors CASCADE;")
         cur.execute("DROP TABLE IF EXISTS Departments CASCADE;")
+        cur.execute("DROP TABLE IF EXISTS Change_Log CASCADE;")
+        cur.execute("DROP TABLE IF EXISTS Change_Log_Epoch;")
     conn.commit()
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Create and populate the university PostgreSQL database")
+    parser.add_argument("--bulk", action="store_true",
+                        help="load generated rows with COPY ... FROM STDIN instead of row-by-row INSERTs")
+    parser.add_argument("--chunk-size", type=int, default=COPY_CHUNK_SIZE,
+                        help="rows sent per COPY statement in bulk mode")
+    parser.add_argument("--defer-constraints", action="store_true",
+                        help="create bare tables, COPY the data, then add keys, unique constraints, "
+                             "foreign keys and change-log triggers and ANALYZE (implies --bulk)")
+    parser.add_argument("--unlogged", action="store_true",
+                        help="create the tables UNLOGGED: faster to load, but emptied after a crash")
+    parser.add_argument("--scale-factor", type=float,
+                        help=f"generate {num_students} students, {num_instructors} instructors and {num_courses} "
+                             "courses times this factor, deterministically from --seed (always uses COPY)")
+    parser.add_argument("--seed", type=int,
+                        help="seed for reproducible datasets; with the same seed and scale factor "
+                             "the generated rows are identical")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="worker processes generating and loading partitions in scaled mode")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="in scaled mode, sample enrollments and course instructors in NumPy blocks "
+                             "(a different, equally reproducible dataset for a given seed)")
+    parser.add_argument("--snapshot-export", metavar="DIR",
+                        help="after loading, export every table to a compressed Parquet snapshot in DIR")
+    parser.add_argument("--snapshot-import", metavar="DIR",
+                        help="restore the tables from the snapshot in DIR instead of generating data")
+    parser.add_argument("--snapshot-version",
+                        help="dataset version recorded in the exported snapshot manifest")
+    parser.add_argument("--checksum", action="store_true",
+                        help="print a digest of every table after loading")
+    args = parser.parse_args()
+    if args.vectorized and args.scale_factor is None and args.seed is None:
+        parser.error("--vectorized only applies to scaled generation, pass --scale-factor and/or --seed")
+    return args
+
 def main():
-    conn = connect(**pg_params)
-    clear_tables(conn)
+    global BULK_LOAD, COPY_CHUNK_SIZE
+    args = parse_args()
+    # COPY is the only load path that works without the unique constraints
+    BULK_LOAD = args.bulk or args.defer_constraints
+    COPY_CHUNK_SIZE = args.chunk_size
+    if args.seed is not None:
+        Faker.seed(args.seed)
+        random.seed(args.seed)
+    scaled = args.scale_factor is not None or args.seed is not None
+
+    phase_times = {}
+    with pg_connection() as conn:
+        clear_tables(conn)
+
+        start_time = time.time()
+        if args.snapshot_import:
+            restore_snapshot(conn, args.snapshot_import)
+            phase_times["restore snapshot"] = time.time() - start_time
+            phase_times.update(add_deferred_constraints(conn))
+        else:
+            phase_times.update(create_and_load(conn, args, scaled))
+
+        for phase, seconds in phase_times.items():
+            print(f"{phase}: {seconds:.2f} seconds")
+
+        if args.snapshot_export:
+            snapshots.export_relational(conn, args.snapshot_export, args.snapshot_version)
+
+        if args.checksum:
+            for table, checksum in dataset_checksum(conn).items():
+                print(f"{table}: {checksum}")
+    close_all()
+
+def create_and_load(conn, args, scaled):
+    phase_times = {}
 
     # Create tables
-    create_tables(conn)
-    generate_departments(conn)
-    generate_instructors(conn , num_instructors)
-    generate_students(conn , num_students)
-    generate_courses(conn , num_courses)
-    map_courses_instructors(conn)
-    generate_enrollments(conn)
-
-    conn.close()
+    start_time = time.time()
+    create_tables(conn, deferred=args.defer_constraints, unlogged=args.unlogged)
+    conn.commit()
+    phase_times["create tables"] = time.time() - start_time
+
+    start_time = time.time()
+    if scaled:
+        generate_scaled(conn, args.seed or 0, args.scale_factor or 1.0, args.workers, args.vectorized)
+    else:
+        generate_departments(conn)
+        generate_instructors(conn , num_instructors)
+        generate_students(conn , num_students)
+        generate_courses(conn , num_courses)
+        map_courses_instructors(conn)
+        generate_enrollments(conn)
+    phase_times["load"] = time.time() - start_time
+
+    if args.defer_constraints:
+        phase_times.update(add_deferred_constraints(conn))
+    else:
+        # Installed after the load so the seeded rows are not written to Change_Log
+        start_time = time.time()
+        with conn.cursor() as cur:
+            create_change_log(cur)
+        conn.commit()
+        phase_times["change log triggers"] = time.time() - start_time
+    return phase_times
 
 if __name__ == "__main__":
     main()
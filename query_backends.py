@@ -0,0 +1,146 @@
+import time
+
+# Queries answered by both backends, by number
+QUERIES = {
+    1: "get_students_in_course",
+    2: "get_avg_students_per_instructor",
+    3: "get_courses_in_department",
+    4: "get_students_per_department",
+    5: "count_instructors_for_cs_courses",
+    6: "get_top_courses_by_enrollments",
+}
+
+# Above this many estimated documents a query is sent to Spark instead of MongoDB
+SPARK_THRESHOLD = 100000
+
+
+class MongoBackend:
+    # The six queries as PyMongo aggregation pipelines / indexed finds. Each call is one
+    # or two round trips to MongoDB, with no Spark job scheduling or JVM overhead.
+    # Results have the same shape as the Spark functions: counts, averages and lists
+    # of rows that can be indexed by field name.
+    name = "mongo"
+
+    def __init__(self, mongo_db):
+        self.db = mongo_db
+
+    def get_students_in_course(self, course_id):
+        result = list(self.db["courses"].aggregate([
+            {"$match": {"course_id": str(course_id)}},
+            {"$unwind": "$enrollments"},
+            {"$group": {"_id": "$enrollments.student_id"}},
+            {"$count": "num_students"},
+        ]))
+        return result[0]["num_students"] if result else 0
+
+    def get_avg_students_per_instructor(self, instructor_id):
+        # The instructor's courses are joined through the unique course_id index
+        result = list(self.db["instructors"].aggregate([
+            {"$match": {"instructor_id": str(instructor_id)}},
+            {"$unwind": "$courses_taught"},
+            {"$group": {"_id": "$courses_taught.course_id"}},
+            {"$lookup": {"from": "courses", "localField": "_id", "foreignField": "course_id",
+                         "pipeline": [{"$project": {"_id": 0, "num_students": {"$size": {"$ifNull": ["$enrollments", []]}}}}],
+                         "as": "course"}},
+            {"$unwind": "$course"},
+            {"$group": {"_id": None, "avg_students": {"$avg": "$course.num_students"}}},
+        ]))
+        return result[0]["avg_students"] if result else None
+
+    def get_courses_in_department(self, department_id):
+        return list(self.db["courses"].find({"department.department_id": department_id},
+                                            {"_id": 0, "course_id": 1, "name": 1, "course_code": 1}))
+
+    def get_students_per_department(self):
+        return [{"department_id": stat["key"], "name": stat["name"], "num_students": int(stat["value"])}
+                for stat in self.db["stats"].find({"type": "department_students"})]
+
+    def count_instructors_for_cs_courses(self):
+        result = list(self.db["courses"].aggregate([
+            {"$match": {"name": {"$regex": "^CSE"}, "Category": "CORE"}},
+            {"$unwind": "$instructors"},
+            {"$group": {"_id": "$instructors.instructor_id"}},
+            {"$count": "num_instructors"},
+        ]))
+        return result[0]["num_instructors"] if result else 0
+
+    def get_top_courses_by_enrollments(self):
+        stats = self.db["stats"]
+        null_enrollments = stats.count_documents({"type": "course_enrollments", "value": None})
+        print(f"Courses with null enrollments: {null_enrollments}")
+        top_courses = [{"course_id": stat["key"], "name": stat["name"],
+                        "enrollments_count": None if stat["value"] is None else int(stat["value"])}
+                       for stat in stats.find({"type": "course_enrollments"})
+                                        .sort([("value", -1)]).limit(10)]
+        for course in top_courses:
+            print(f"Course ID: {course['course_id']}, Course Name: {course['name']}, Enrollments: {course['enrollments_count']}")
+        return top_courses
+
+
+class QueryRouter:
+    # Sends each query to MongoDB or Spark depending on how many documents it is
+    # estimated to read. The estimates come from collection metadata counts, from
+    # which filters the indexes built by the migration can answer and, for the
+    # queries that take an id, from one indexed lookup on that id.
+    # Every call is recorded in self.runs with the backend that served it.
+    def __init__(self, mongo_backend, spark_backend, spark_threshold=None):
+        self.backends = {"mongo": mongo_backend, "spark": spark_backend}
+        self.spark_threshold = spark_threshold or SPARK_THRESHOLD
+        self.counts = {}
+        self.runs = []
+
+    def count(self, collection):
+        # estimated_document_count reads collection metadata, not the documents
+        if collection not in self.counts:
+            self.counts[collection] = self.backends["mongo"].db[collection].estimated_document_count()
+        return self.counts[collection]
+
+    def estimate(self, number, *args):
+        db = self.backends["mongo"].db
+        if number == 1:
+            return 1   # Unique course_id index
+        if number == 2:
+            # The instructor, then one course per entry of courses_taught, both by unique
+            # key; the number of courses is read from the instructor_courses stats document
+            stat = db["stats"].find_one({"_id": f"instructor_courses:{args[0]}"}, {"value": 1})
+            return 1 + (int(stat["value"]) if stat and stat["value"] is not None else 0)
+        if number == 3:
+            # Counted on the department.department_id index without reading the courses
+            return db["courses"].count_documents({"department.department_id": args[0]})
+        if number == 4:
+            return self.count("departments")   # One stats document per department
+        if number == 5:
+            return self.count("courses")       # Prefix filter on name: no index, full scan
+        return 10                              # {type, value} index: top 10 and a covered count
+
+    def choose(self, number, *args):
+        estimate = self.estimate(number, *args)
+        return ("mongo" if estimate <= self.spark_threshold else "spark"), estimate
+
+    def run(self, number, *args):
+        backend, estimate = self.choose(number, *args)
+        start_time = time.time()
+        result = getattr(self.backends[backend], QUERIES[number])(*args)
+        execution_time = time.time() - start_time
+        self.runs.append({"query": number, "backend": backend, "estimated_documents": estimate,
+                          "seconds": round(execution_time, 6)})
+        print(f"Query {number} ran on {backend} (~{estimate} documents) in {execution_time:.3f} seconds")
+        return result
+
+    def get_students_in_course(self, course_id):
+        return self.run(1, course_id)
+
+    def get_avg_students_per_instructor(self, instructor_id):
+        return self.run(2, instructor_id)
+
+    def get_courses_in_department(self, department_id):
+        return self.run(3, department_id)
+
+    def get_students_per_department(self):
+        return self.run(4)
+
+    def count_instructors_for_cs_courses(self):
+        return self.run(5)
+
+    def get_top_courses_by_enrollments(self):
+        return self.run(6)
@@ -0,0 +1,64 @@
+import pandas as pd
+from pyspark import StorageLevel
+
+# Results of up to this many rows are fetched in one Arrow batch with toPandas;
+# larger ones are streamed a partition at a time with toLocalIterator
+STREAM_THRESHOLD = 100000
+
+
+class QueryResult:
+    # Rows of a query result, iterable as records indexed by column name. Small and
+    # medium results are held as a pandas DataFrame built through Arrow; large ones
+    # are streamed from the executors on every iteration, so the driver holds one
+    # partition at a time. close() releases a streamed result.
+    def __init__(self, df, threshold=None):
+        self.threshold = threshold or STREAM_THRESHOLD
+        self.columns = df.columns
+        # The result is persisted on the executors' disks before anything runs, so the
+        # query is computed once: the partitions read by the probe below are cached and
+        # streaming, repeated iterations and to_pandas() read them back. A frame that
+        # is already cached (e.g. by the catalog) is left as it is.
+        self.owns_cache = not df.is_cached
+        self.df = df.persist(StorageLevel.DISK_ONLY) if self.owns_cache else df
+        # At most threshold + 1 rows are fetched: if that is the whole result it is
+        # kept, otherwise the result is too large to hold and is streamed instead
+        frame = self.df.limit(self.threshold + 1).toPandas()
+        self.streamed = len(frame) > self.threshold
+        self.frame = None if self.streamed else frame
+        if not self.streamed:
+            self.close()
+
+    def __iter__(self):
+        if self.streamed:
+            return self.df.toLocalIterator(prefetchPartitions=True)
+        # Nullable dtypes keep integer columns with nulls as integers
+        return iter(self.frame.convert_dtypes().to_dict("records"))
+
+    def to_pandas(self):
+        if self.frame is not None:
+            return self.frame
+        return pd.DataFrame.from_records((row.asDict() for row in self), columns=self.columns)
+
+    def close(self):
+        # Drops the partitions cached for this result
+        if self.owns_cache:
+            self.df.unpersist()
+            self.owns_cache = False
+
+
+def fetch(df, threshold=None):
+    return QueryResult(df, threshold)
+
+
+def print_rows(result, limit=20):
+    # Prints the first rows like DataFrame.show() and returns the total row count,
+    # in a single pass over the result
+    print(" | ".join(result.columns))
+    count = 0
+    for row in result:
+        if count < limit:
+            print(" | ".join(str(row[column]) for column in result.columns))
+        count += 1
+    if count > limit:
+        print(f"only showing top {limit} rows")
+    return count
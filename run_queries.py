@@ -0,0 +1,88 @@
+import argparse
+import importlib
+import db_connections
+from query_backends import MongoBackend, QueryRouter, SPARK_THRESHOLD
+from spark_session import stop_spark
+
+# Query modules that can be run: the original queries, the optimized versions and
+# the same queries over the partitioned Parquet export
+MODULES = {
+    "baseline": "apachespartkqueries",
+    "optimizations": "optimizations",
+    "parquet": "parquet_queries",
+}
+
+# Storage levels of the optimizations catalog; NONE pushes every query down to MongoDB
+STORAGE_LEVELS = ["MEMORY_AND_DISK", "MEMORY_ONLY", "DISK_ONLY", "NONE"]
+
+
+def run_query(queries, number, args):
+    if number == 1:
+        print(queries.get_students_in_course(args.course_id))
+    elif number == 2:
+        average_students = queries.get_avg_students_per_instructor(args.instructor_id)
+        print(f"Average students per course for instructor '{args.instructor_id}': {round(average_students)}")
+    elif number == 3:
+        print(f"Courses offered by department '{args.department_id}':")
+        for course in queries.get_courses_in_department(args.department_id):
+            print(f"{course['name']} ({course['course_code']})")
+    elif number == 4:
+        print("Students per department:")
+        for dept in queries.get_students_per_department():
+            print(f"{dept['name']}: {dept['num_students']} students")
+    elif number == 5:
+        print(f"Number of distinct instructors for courses starting with 'CSE': {queries.count_instructors_for_cs_courses()}")
+    elif number == 6:
+        queries.get_top_courses_by_enrollments()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the Spark queries against the migrated MongoDB database")
+    parser.add_argument("--module", choices=list(MODULES), default="optimizations",
+                        help="baseline: the original queries; optimizations: the cached/pushdown versions; "
+                             "parquet: read the Parquet export instead of MongoDB")
+    parser.add_argument("--parquet-dir", help="Parquet export to read with --module parquet "
+                                              "(default: $PARQUET_DIR or ./parquet)")
+    parser.add_argument("--storage-level", choices=STORAGE_LEVELS,
+                        help="with --module optimizations, how the catalog persists collections; NONE pushes "
+                             "filters and projections down to MongoDB (default: $SPARK_STORAGE_LEVEL or MEMORY_AND_DISK)")
+    parser.add_argument("--backend", choices=["spark", "mongo", "auto"], default="spark",
+                        help="spark: the Spark functions of --module; mongo: PyMongo aggregation pipelines; "
+                             "auto: pick one per query from collection counts and index selectivity")
+    parser.add_argument("--spark-threshold", type=int, default=SPARK_THRESHOLD,
+                        help="with --backend auto, queries estimated to read more documents run on Spark")
+    parser.add_argument("--query", type=int, action="append", choices=range(1, 7),
+                        help="query number to run (repeatable); all six queries by default")
+    parser.add_argument("--course-id", default="1", help="course for query 1")
+    parser.add_argument("--instructor-id", default="9", help="instructor for query 2")
+    parser.add_argument("--department-id", default="2", help="department for query 3")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # The query module is imported only once the arguments are valid; the Spark session
+    # is started by the first query that needs it
+    queries = importlib.import_module(MODULES[args.module])
+    if args.module == "parquet" and args.parquet_dir:
+        queries.configure(args.parquet_dir)
+    if args.module == "optimizations" and args.storage_level:
+        queries.configure(args.storage_level)
+    if args.backend == "mongo":
+        queries = MongoBackend(db_connections.get_mongo_db())
+    elif args.backend == "auto":
+        queries = QueryRouter(MongoBackend(db_connections.get_mongo_db()), queries, args.spark_threshold)
+    try:
+        for number in args.query or range(1, 7):
+            run_query(queries, number, args)
+    finally:
+        stop_spark()
+        db_connections.close_all()
+    if args.backend == "auto":
+        print("Backends used:")
+        for run in queries.runs:
+            print(f"  Query {run['query']}: {run['backend']} ({run['seconds']:.3f} seconds)")
+
+
+if __name__ == "__main__":
+    main()
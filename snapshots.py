@@ -0,0 +1,125 @@
+import gzip
+import json
+import os
+import time
+import bson
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import json_util
+
+# Snapshot layout: one Parquet file per relational table, one compressed
+# BSON/JSONL file per Mongo collection and a manifest describing both.
+# Both kinds of files can be read directly by Spark (spark.read.parquet / .json).
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+RELATIONAL_SCHEMAS = {
+    "Departments": pa.schema([("department_id", pa.int32()), ("department_name", pa.string())]),
+    "Instructors": pa.schema([("instructor_id", pa.int32()), ("name", pa.string()),
+                              ("email", pa.string()), ("department_id", pa.int32())]),
+    "Students": pa.schema([("student_id", pa.int32()), ("name", pa.string()),
+                           ("email", pa.string()), ("department_id", pa.int32())]),
+    "Courses": pa.schema([("course_id", pa.int32()), ("course_name", pa.string()), ("course_code", pa.string()),
+                          ("department_id", pa.int32()), ("is_elective", pa.string())]),
+    "Course_Instructors": pa.schema([("course_id", pa.int32()), ("instructor_id", pa.int32())]),
+    "Enrollments": pa.schema([("student_id", pa.int32()), ("course_id", pa.int32())]),
+}
+
+# Rows per Parquet row group / cursor round trip
+SNAPSHOT_BATCH_SIZE = 100000
+
+
+def read_manifest(snapshot_dir):
+    path = os.path.join(snapshot_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {"format_version": SNAPSHOT_FORMAT_VERSION, "relational": {}, "documents": {}}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest["format_version"] != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Snapshot {snapshot_dir} has format version {manifest['format_version']}, "
+                         f"expected {SNAPSHOT_FORMAT_VERSION}")
+    return manifest
+
+
+def write_manifest(snapshot_dir, manifest, section, entries, dataset_version=None):
+    manifest[section] = entries
+    manifest["dataset_version"] = dataset_version or manifest.get("dataset_version") or time.strftime("%Y%m%d%H%M%S")
+    manifest[f"{section}_exported_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with open(os.path.join(snapshot_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def export_relational(conn, snapshot_dir, dataset_version=None, compression="zstd"):
+    # Stream each table through a server-side cursor into a compressed Parquet file
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest = read_manifest(snapshot_dir)
+    entries = {}
+    for table, schema in RELATIONAL_SCHEMAS.items():
+        start_time = time.time()
+        file_name = f"{table.lower()}.parquet"
+        rows = 0
+        with pq.ParquetWriter(os.path.join(snapshot_dir, file_name), schema, compression=compression) as writer:
+            with conn.cursor(name=f"snapshot_{table.lower()}") as cur:
+                cur.itersize = SNAPSHOT_BATCH_SIZE
+                cur.execute(f"SELECT {', '.join(schema.names)} FROM {table} ORDER BY 1")
+                while True:
+                    batch = cur.fetchmany(SNAPSHOT_BATCH_SIZE)
+                    if not batch:
+                        break
+                    columns = list(zip(*batch))
+                    writer.write_batch(pa.record_batch([pa.array(column, type=field.type)
+                                                        for column, field in zip(columns, schema)], schema=schema))
+                    rows += len(batch)
+            conn.commit()
+        entries[table] = {"file": file_name, "rows": rows}
+        print(f"Snapshot {table}: {rows} rows in {time.time() - start_time:.2f} seconds")
+    write_manifest(snapshot_dir, manifest, "relational", entries, dataset_version)
+    return entries
+
+
+def read_relational(snapshot_dir, table):
+    # Yields row tuples of one table, a row group at a time
+    entry = read_manifest(snapshot_dir)["relational"][table]
+    parquet_file = pq.ParquetFile(os.path.join(snapshot_dir, entry["file"]))
+    for batch in parquet_file.iter_batches(batch_size=SNAPSHOT_BATCH_SIZE):
+        yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+def export_documents(mongo_db, collections, snapshot_dir, dataset_version=None, documents_format="jsonl",
+                     change_log_watermark=None):
+    # _id is left out: documents get fresh ids when they are restored. The change-log
+    # watermark the documents are current to is kept so a restore can resume
+    # incremental syncs from the same position
+    os.makedirs(snapshot_dir, exist_ok=True)
+    manifest = read_manifest(snapshot_dir)
+    manifest["change_log_watermark"] = change_log_watermark
+    entries = {}
+    for collection in collections:
+        start_time = time.time()
+        file_name = f"{collection}.{documents_format}.gz"
+        count = 0
+        with gzip.open(os.path.join(snapshot_dir, file_name), "wb") as f:
+            for doc in mongo_db[collection].find({}, {"_id": 0}, batch_size=SNAPSHOT_BATCH_SIZE):
+                if documents_format == "bson":
+                    f.write(bson.encode(doc))
+                else:
+                    f.write(json_util.dumps(doc).encode() + b"\n")
+                count += 1
+        entries[collection] = {"file": file_name, "format": documents_format, "documents": count}
+        print(f"Snapshot {collection}: {count} documents in {time.time() - start_time:.2f} seconds")
+    write_manifest(snapshot_dir, manifest, "documents", entries, dataset_version)
+    return entries
+
+
+def read_change_log_watermark(snapshot_dir):
+    return read_manifest(snapshot_dir).get("change_log_watermark")
+
+
+def read_documents(snapshot_dir, collection):
+    entry = read_manifest(snapshot_dir)["documents"][collection]
+    with gzip.open(os.path.join(snapshot_dir, entry["file"]), "rb") as f:
+        if entry["format"] == "bson":
+            yield from bson.decode_file_iter(f)
+        else:
+            for line in f:
+                yield json_util.loads(line)
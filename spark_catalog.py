@@ -0,0 +1,64 @@
+from pyspark import StorageLevel
+from pymongo import MongoClient
+from mongo_query import MONGO_FORMAT, collection_schema
+
+
+class MongoCatalog:
+    # Loads each MongoDB collection once per Spark session, persists it at the given
+    # storage level and serves every query from the persisted DataFrame. The cache is
+    # dropped whenever the migration records a new data version in migration_meta.
+    def __init__(self, spark, mongo_uri, db_name, storage_level="MEMORY_AND_DISK"):
+        self.spark = spark
+        self.storage_level = getattr(StorageLevel, storage_level) if isinstance(storage_level, str) else storage_level
+        self.frames = {}
+        self.data_version = None
+        self._meta = MongoClient(mongo_uri)[db_name]["migration_meta"]
+
+    def current_version(self):
+        meta = self._meta.find_one({"_id": "data_version"})
+        return meta["version"] if meta else None
+
+    def refresh_if_stale(self):
+        version = self.current_version()
+        if version != self.data_version:
+            self.invalidate()
+            self.data_version = version
+
+    def load(self, collection):
+        self.refresh_if_stale()
+        if collection not in self.frames:
+            df = self.spark.read.format(MONGO_FORMAT) \
+                .option("collection", collection) \
+                .schema(collection_schema(collection)) \
+                .load()
+            if self.storage_level is not None:
+                df = df.persist(self.storage_level)
+            self.frames[collection] = df
+        return self.frames[collection]
+
+    def derived(self, name, build):
+        # A result computed from the cached collections, persisted and materialized
+        # once per data version like the collections themselves; without a storage
+        # level only the plan is kept and each use recomputes it
+        self.refresh_if_stale()
+        if name not in self.frames:
+            df = build()
+            if self.storage_level is not None:
+                df = df.persist(self.storage_level)
+                df.count()
+            self.frames[name] = df
+        return self.frames[name]
+
+    def query(self, mongo_query):
+        # With a storage level every query filters the persisted collection in Spark,
+        # which is loaded on first use; without one each query pushes its filters and
+        # projection down to MongoDB and nothing is kept between queries
+        if self.storage_level is None:
+            return mongo_query.load(self.spark)
+        return mongo_query.apply(self.load(mongo_query.collection))
+
+    def invalidate(self, collection=None):
+        for name in ([collection] if collection else list(self.frames)):
+            df = self.frames.pop(name, None)
+            if df is not None:
+                df.unpersist()
@@ -0,0 +1,41 @@
+from pyspark.sql import SparkSession
+
+mongo_host = "localhost"
+mongo_port = "27017"
+mongo_user = "admin"
+mongo_password = "password"
+auth_db = "admin"
+db_name = "university_mongodb"
+
+_spark = None
+
+
+def mongo_uri(database=db_name):
+    return f"mongodb://{mongo_user}:{mongo_password}@{mongo_host}:{mongo_port}/{database}?authSource={auth_db}"
+
+
+def get_spark():
+    # The session (and its JVM) is started on first use and shared by every query
+    global _spark
+    if _spark is None:
+        try:
+            _spark = SparkSession.builder \
+                .appName("SparkMongoDBExample") \
+                .config("spark.jars.packages", "org.mongodb.spark:mongo-spark-connector_2.12:3.0.1") \
+                .config("spark.mongodb.input.uri", mongo_uri()) \
+                .config("spark.mongodb.output.uri", mongo_uri()) \
+                .config("spark.sql.execution.arrow.pyspark.enabled", "true") \
+                .config("spark.sql.execution.arrow.pyspark.fallback.enabled", "true") \
+                .getOrCreate()
+        except Exception as e:
+            print("An error occurred:", e)
+            raise
+        print("Session created")
+    return _spark
+
+
+def stop_spark():
+    global _spark
+    if _spark is not None:
+        _spark.stop()
+        _spark = None